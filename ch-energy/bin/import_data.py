@@ -9,30 +9,48 @@ the web app.
 Basic usage:
     python import_data.py --dest_root .
 
-Downloaded files are stored in /tmp/ch-energy/downloads.
+Downloaded files are stored in $DEST_ROOT/downloads, or in the directory given by
+--download-dir.
 
 Output files:
 - $DEST_ROOT/data/facilities.json.gz (facilities with GPS coordinates and essential fields only)
 - $DEST_ROOT/data/production.json.gz (historical production data)
 - $DEST_ROOT/data/trade.json.gz (trade data)
+
+With --compression zstd (requires the zstandard package), the output files are written as
+.json.zst instead.
 """
 
 import argparse
 import csv
+import dataclasses
 import gzip
+import io
 import json
 import logging
+import math
 import os
-import shutil
+import re
+import sqlite3
 import sys
 import tempfile
+import threading
 import time
 import zipfile
-from collections import defaultdict
+from collections import Counter, defaultdict
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from pyproj import Transformer
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logging.basicConfig(
     level=logging.INFO,
@@ -45,9 +63,50 @@ logger = logging.getLogger(__name__)
 FACILITIES_URL = "https://data.geo.admin.ch/ch.bfe.elektrizitaetsproduktionsanlagen/csv/2056/ch.bfe.elektrizitaetsproduktionsanlagen.zip"
 PRODUCTION_URL = "https://www.uvek-gis.admin.ch/BFE/ogd/104/ogd104_stromproduktion_swissgrid.csv"
 TRADE_URL = "https://www.bfe-ogd.ch/ogd107_strom_import_export.csv"
-DOWNLOAD_PATH = "/tmp/ch-energy/downloads"
+FACILITIES_CSV = "ElectricityProductionPlant.csv"
+DOWNLOAD_STATE_FILE = "state.json"
 #pylint: enable=line-too-long
 
+# Serializes access to the download state file from concurrent downloads
+DOWNLOAD_STATE_LOCK = threading.Lock()
+
+# Buffer sizes for reading large input files and writing compressed output
+READ_BUFFER_SIZE = 1 << 20
+WRITE_BUFFER_SIZE = 1 << 16
+
+# Chunk size for streaming downloads to disk
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+# Shared HTTP session for all downloads: keeps connections alive across requests
+# and retries transient server errors.
+SESSION = requests.Session()
+SESSION.headers.update({
+    'User-Agent': ('Swiss Energy Explorer' +
+                   ' (https://maxp.net/ch-energy, contact: maxp@maxp.net)')
+})
+SESSION.mount('https://', HTTPAdapter(
+    pool_connections=10,
+    pool_maxsize=10,
+    max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504])
+))
+
+# Separate session for Nominatim, without automatic retries: a retry would be sent
+# immediately and bypass the rate limiting in Geocoder.geocode.
+GEOCODE_SESSION = requests.Session()
+GEOCODE_SESSION.headers.update(SESSION.headers)
+
+# Coordinate transformer from Swiss LV95 to WGS84, (east, north) -> (lon, lat)
+TRANSFORMER = Transformer.from_crs("EPSG:2056", "EPSG:4326", always_xy=True)
+
+# Number of records encoded at a time when writing output files
+JSON_CHUNK_RECORDS = 1000
+
+# Output file suffix for each supported compression format
+OUTPUT_SUFFIXES = {
+    'gzip': '.json.gz',
+    'zstd': '.json.zst'
+}
+
 # Position of energy source in output array (input file is in German)
 PRODUCTION_SOURCE_INDEX = {
     'Speicherkraft': 0,      # Hydro (pumped storage)
@@ -79,7 +138,8 @@ TRADE_FLOW_INDEX = {
     'CH_IT_GWh': 7       # Switzerland to Italy
 }
 
-# Fields to keep from facilities data
+# Fields to keep from facilities data. Each facility is output as an array of these
+# values in this order (no per-row keys); the web app maps positions to names.
 REQUIRED_FIELDS = [
     "Municipality",
     "Canton",
@@ -90,28 +150,66 @@ REQUIRED_FIELDS = [
     "lon"
 ]
 
+# Minimum time between the starts of two Nominatim requests, in seconds. The usage
+# policy allows at most 1 request per second; keep some margin for clock jitter.
+NOMINATIM_REQUEST_INTERVAL = 1.1
+
+# Decimal numbers in CSV files (integers or with a fractional part)
+NUMBER_RE = re.compile(r'-?(?:\d+(?:\.\d*)?|\.\d+)', re.ASCII)
+
+# Negative geocoding results are retried after this many seconds
+NEGATIVE_CACHE_TTL = 30 * 86400
+
+# Fields used to geocode facilities without coordinates
+ADDRESS_FIELDS = ['Address', 'PostCode', 'Municipality']
+
+@dataclasses.dataclass
+class FacilityStats:
+    """Summary statistics of imported facilities, accumulated during the import."""
+    num_facilities : int = 0
+    with_coords : int = 0
+    geocoded : int = 0
+    total_power : float = 0.0   # kW
+    sources : Counter = dataclasses.field(default_factory=Counter)
+
 class Geocoder:
     """
-    Geocoder using Nominatim (https://nominatim.org/) with caching.
+    Geocoder using Nominatim (https://nominatim.org/) with a persistent SQLite cache.
     """
 
     def __init__(self, cache_file : str):
+        if cache_file.endswith('.txt'):
+            # Legacy text cache: migrate it into an SQLite cache next to it (see load)
+            sqlite_file = os.path.splitext(cache_file)[0] + '.sqlite'
+            logger.info("Using %s as geocoding cache instead of legacy %s", sqlite_file, cache_file)
+            cache_file = sqlite_file
         self.cache_file = cache_file
-        self.cache = {}
+        self.db = sqlite3.connect(cache_file)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS geocode_cache (
+            key TEXT PRIMARY KEY, lat REAL, lon REAL, fetched_at INTEGER)""")
         self.load()
         self.num_requests = 0
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': ('Swiss Energy Explorer' +
-                           ' (https://maxp.net/ch-energy, contact: maxp@maxp.net)')
-        })
+        self.last_request_time = 0.0
 
     def load(self):
-        """Load the geocoding cache from file."""
-        self.cache = {}
-        if not os.path.exists(self.cache_file):
-            return
-        with open(self.cache_file, 'r', encoding='utf-8') as f:
+        """Prepare the geocoding cache: import the legacy text cache and expire negative results."""
+        num_entries = self.db.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        legacy_file = os.path.splitext(self.cache_file)[0] + '.txt'
+        if num_entries == 0 and legacy_file != self.cache_file and os.path.exists(legacy_file):
+            self.import_legacy_cache(legacy_file)
+
+        expired = self.db.execute(
+            "DELETE FROM geocode_cache WHERE lat IS NULL AND fetched_at < ?",
+            (int(time.time()) - NEGATIVE_CACHE_TTL,)).rowcount
+        self.db.commit()
+        num_entries = self.db.execute("SELECT COUNT(*) FROM geocode_cache").fetchone()[0]
+        logger.info("Loaded %d entries from geocoding cache (%d negative results expired)",
+                    num_entries, expired)
+
+    def import_legacy_cache(self, legacy_file : str):
+        """Import entries from a tab-separated text cache (key, lat, lon)."""
+        entries = []
+        with open(legacy_file, 'r', encoding='utf-8') as f:
             for line in f:
                 line = line.strip()
                 if not line:
@@ -122,17 +220,15 @@ class Geocoder:
                 query_hash = parts[0]
                 lat = float(parts[1]) if parts[1] != 'None' else None
                 lon = float(parts[2]) if parts[2] != 'None' else None
-                self.cache[query_hash] = (lat, lon)
-        logger.info("Loaded %d entries from geocoding cache", len(self.cache))
+                entries.append((query_hash, lat, lon, int(time.time())))
+        self.db.executemany("INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?, ?)", entries)
+        self.db.commit()
+        logger.info("Imported %d entries from legacy geocoding cache %s", len(entries), legacy_file)
 
     def save(self):
-        """Save the geocoding cache to file."""
-        with open(self.cache_file, 'w', encoding='utf-8') as f:
-            for query_hash, (lat, lon) in self.cache.items():
-                lat_str = str(lat) if lat is not None else 'None'
-                lon_str = str(lon) if lon is not None else 'None'
-                f.write(f"{query_hash}\t{lat_str}\t{lon_str}\n")
-        logger.info("Saved %d entries to geocoding cache", len(self.cache))
+        """Commit pending geocoding results to the cache."""
+        self.db.commit()
+        logger.info("Saved geocoding cache (%d new requests)", self.num_requests)
 
     def geocode(self, address_parts : dict[str, str]) -> tuple[float, float] | None:
         """
@@ -140,9 +236,11 @@ class Geocoder:
         Returns (lat, lon) tuple or (None, None) if not found.
         """
         cache_key = ('|'.join([ str(address_parts[f]).strip().replace('\t', ' ').replace('|', ' ')
-            for f in ['Address', 'PostCode', 'Municipality']]))
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+            for f in ADDRESS_FIELDS]))
+        cached = self.db.execute(
+            "SELECT lat, lon FROM geocode_cache WHERE key = ?", (cache_key,)).fetchone()
+        if cached is not None:
+            return cached
 
         # Use Nominatim API
         url = "https://nominatim.openstreetmap.org/search"
@@ -156,11 +254,17 @@ class Geocoder:
             'addressdetails': 0
         }
 
-        response = self.session.get(url, params=params, timeout=10)
+        # Rate limiting (https://operations.osmfoundation.org/policies/nominatim/). Requests are
+        # spaced by their start times, so the response latency counts towards the interval.
+        wait = self.last_request_time + NOMINATIM_REQUEST_INTERVAL - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self.last_request_time = time.monotonic()
+
+        response = GEOCODE_SESSION.get(url, params=params, timeout=10)
         response.raise_for_status()
         data = response.json()
         self.num_requests += 1
-        time.sleep(1.5) # Rate limiting (https://operations.osmfoundation.org/policies/nominatim/)
 
         if data and len(data) > 0 and 'lat' in data[0] and 'lon' in data[0]:
             lat, lon = float(data[0]['lat']), float(data[0]['lon'])
@@ -169,7 +273,8 @@ class Geocoder:
             lat, lon = None, None
             logger.debug("No geocoding result for '%s'", cache_key)
 
-        self.cache[cache_key] = (lat, lon)
+        self.db.execute("INSERT OR REPLACE INTO geocode_cache VALUES (?, ?, ?, ?)",
+                        (cache_key, lat, lon, int(time.time())))
 
         if self.num_requests % 100 == 0:
             logger.info("Geocoded %d addresses", self.num_requests)
@@ -177,61 +282,150 @@ class Geocoder:
 
         return lat, lon
 
-def ensure_directories(dest_root : str):
+def ensure_directories(dest_root : str, download_dir : str):
     """Create necessary directories if they don't exist."""
-    os.makedirs(DOWNLOAD_PATH, exist_ok=True)
+    os.makedirs(download_dir, exist_ok=True)
     os.makedirs(os.path.join(dest_root, "data"), exist_ok=True)
 
-def download_facilities():
-    """Download and extract facilities data."""
-    logger.info("Downloading facilities data from %s", FACILITIES_URL)
-
+def save_response(response : requests.Response, path : str,
+                  validate : Callable[[str], None] | None = None):
+    """
+    Stream the body of a (stream=True) response to a file, one chunk at a time. If given,
+    validate is called on the complete download before it replaces path.
+    """
+    # Write to a temporary name first, so an interrupted or invalid download never
+    # replaces the file at path
+    temp_path = path + '.part'
     try:
-        response = requests.get(FACILITIES_URL, timeout=120)
-        response.raise_for_status()
-
-        zip_path = os.path.join(DOWNLOAD_PATH, "facilities.zip")
-        with open(zip_path, 'wb') as f:
-            f.write(response.content)
-
-        extract_dir = os.path.join(DOWNLOAD_PATH, "facilities")
-        os.makedirs(extract_dir, exist_ok=True)
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
+        with open(temp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
+        if validate is not None:
+            validate(temp_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    os.replace(temp_path, path)
 
-        csv_path = os.path.join(extract_dir, "ElectricityProductionPlant.csv")
-        if not os.path.exists(csv_path):
-            raise FileNotFoundError("ElectricityProductionPlant.csv not found in extracted files")
+def read_download_state(state_file : str) -> dict:
+    """
+    Read the download state file. A missing, unreadable or invalid file is treated as empty,
+    so that data is downloaded again instead of failing on every run.
+    """
+    if not os.path.exists(state_file):
+        return {}
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if not isinstance(state, dict):
+            raise ValueError("not a JSON object")
+        return state
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring invalid download state file %s: %s", state_file, e)
+        return {}
+
+def load_download_state(state_file : str, url : str) -> dict | None:
+    """Load the validators (ETag, Last-Modified) and file path of the previous download of url."""
+    with DOWNLOAD_STATE_LOCK:
+        return read_download_state(state_file).get(url)
+
+def save_download_state(state_file : str, url : str, entry : dict):
+    """Save the validators and file path of the latest download of url."""
+    with DOWNLOAD_STATE_LOCK:
+        state = read_download_state(state_file)
+        state[url] = entry
+        # Write to a temporary name first, so an interrupted write never corrupts the state
+        temp_path = state_file + '.part'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(temp_path, state_file)
+
+def download_if_modified(url : str, path : str, data_type : str, force : bool = False,
+                         validate : Callable[[str], None] | None = None) -> str:
+    """
+    Download url to path and return the path of the current data. Unless force is set, a
+    conditional GET is sent, and if the data has not changed since the previous download,
+    the previously downloaded file is returned instead. If given, validate is called with
+    the path of a new download and raises if the file is unusable; the download is then
+    discarded, leaving the previous file and its state untouched. A previous download
+    stored under a different path is removed once the new one is recorded.
+    """
+    logger.info("Downloading %s data from %s", data_type, url)
 
-        return csv_path
+    # Validators of previous downloads are kept next to the downloaded files
+    state_file = os.path.join(os.path.dirname(path), DOWNLOAD_STATE_FILE)
+    previous = load_download_state(state_file, url)
+    headers = {}
+    if previous and not force and os.path.exists(previous['path']):
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    response = SESSION.get(url, headers=headers, stream=True, timeout=(5, 120))
+    response.raise_for_status()
+    if response.status_code == 304:
+        logger.info("%s data not modified, using %s", data_type, previous['path'])
+        return previous['path']
+
+    save_response(response, path, validate)
+
+    save_download_state(state_file, url, {
+        'path': path,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    })
+    if previous and previous['path'] != path and os.path.exists(previous['path']):
+        logger.info("Removing previous %s download %s", data_type, previous['path'])
+        os.unlink(previous['path'])
+    return path
+
+def check_facilities_zip(zip_path : str):
+    """Check that zip_path is a ZIP archive containing the facilities CSV file."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        if FACILITIES_CSV not in zip_ref.namelist():
+            raise FileNotFoundError(f"{FACILITIES_CSV} not found in {zip_path}")
+
+def download_facilities(download_dir : str, force : bool = False) -> str:
+    """Download facilities data (unless unchanged) and return the path of the ZIP archive."""
+    try:
+        return download_if_modified(
+            FACILITIES_URL, os.path.join(download_dir, "facilities.zip"), "facilities", force,
+            validate=check_facilities_zip)
 
     except requests.RequestException as e:
         logger.error("Failed to download facilities data: %s", e)
         raise
     except zipfile.BadZipFile as e:
-        logger.error("Failed to extract ZIP file: %s", e)
+        logger.error("Failed to open ZIP file: %s", e)
         raise
 
-def download_csv(url: str, data_type: str) -> str:
-    """Download CSV data from URL."""
-    logger.info("Downloading %s data from %s", data_type, url)
+def download_csv(url: str, data_type: str, download_dir: str, force: bool = False) -> str:
+    """
+    Download CSV data from URL and return the path of the downloaded file.
+    Unless force is set, a file already downloaded today is reused without any request, and
+    if the data has not changed since the last download, the previous file is returned.
+    """
+    timestamp = datetime.now().strftime("%Y%m%d") # Data changes at most once a day.
+    csv_filename = os.path.join(download_dir, f"{data_type}_{timestamp}.csv")
+    if not force and os.path.exists(csv_filename):
+        logger.info("Using %s data downloaded earlier today: %s", data_type, csv_filename)
+        return csv_filename
 
     try:
-        response = requests.get(url, timeout=60)
-        response.raise_for_status()
-
-        timestamp = datetime.now().strftime("%Y%m%d") # Data changes at most once a day.
-        csv_filename = os.path.join(DOWNLOAD_PATH, f"{data_type}_{timestamp}.csv")
-        with open(csv_filename, 'w', encoding='utf-8') as f:
-            f.write(response.text)
-
-        return response.text
+        return download_if_modified(url, csv_filename, data_type, force)
 
     except requests.RequestException as e:
         logger.error("Download failed: %s", e)
         raise e
 
-def load_catalogue_translations(extract_dir : str) -> dict[str, str]:
+def open_zip_member(zip_ref : zipfile.ZipFile, name : str) -> io.TextIOWrapper:
+    """Open a CSV file in a ZIP archive for streaming, without extracting it to disk."""
+    raw = io.BufferedReader(zip_ref.open(name), buffer_size=READ_BUFFER_SIZE)
+    return io.TextIOWrapper(raw, encoding='utf-8', newline='')
+
+def load_catalogue_translations(zip_ref : zipfile.ZipFile) -> dict[str, str]:
     """Load translation dictionaries from 'catalogue' CSV files."""
     logger.info("Loading translation dictionaries from catalogs...")
     translations = {}
@@ -243,183 +437,261 @@ def load_catalogue_translations(extract_dir : str) -> dict[str, str]:
         "SubCategoryCatalogue.csv"
     ]
 
+    members = set(zip_ref.namelist())
     for filename in catalogue_files:
-        filepath = os.path.join(extract_dir, filename)
-        if not os.path.exists(filepath):
-            logger.warning("Catalogue file not found: %s", filepath)
+        if filename not in members:
+            logger.warning("Catalogue file not found: %s", filename)
             continue
 
-        with open(filepath, 'r', encoding='utf-8') as f:
+        with open_zip_member(zip_ref, filename) as f:
             csvreader = csv.reader(f)
             for row in csvreader:
                 if not row or row[0].startswith('Catalogue'):
                     continue
                 code, *translations_list = row
                 # Use the last (English) translation
-                translations[code] = translations_list[-1].strip()
+                translations[code] = sys.intern(translations_list[-1].strip())
     return translations
 
-def import_facilities(csv_path : str, geocoder : Geocoder) -> list[dict]:
-    """Import facilities data from CSV file."""
-    extract_dir = os.path.dirname(csv_path)
-    translations = load_catalogue_translations(extract_dir)
-
+def parse_number(value : str) -> int | float | str:
+    """Convert a numeric CSV value to int or float; return other values unchanged."""
+    if NUMBER_RE.fullmatch(value):
+        return float(value) if '.' in value else int(value)
+    return value
+
+def import_facilities(zip_path : str, geocoder : Geocoder) -> tuple[list[list], FacilityStats]:
+    """Import facilities data and statistics from the CSV files in the facilities ZIP archive."""
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        translations = load_catalogue_translations(zip_ref)
+        return import_facilities_csv(zip_ref, translations, geocoder)
+
+def import_facilities_csv(zip_ref : zipfile.ZipFile, translations : dict[str, str],
+                          geocoder : Geocoder) -> tuple[list[list], FacilityStats]:
+    """Import facilities from the main CSV file, translating catalogue codes."""
     logger.info("Importing facilities data...")
 
-    # Coordinate transformer from Swiss LV95 to WGS84
-    transformer = Transformer.from_crs("EPSG:2056", "EPSG:4326")
+    # Converters for the fields kept from each row (lat/lon are computed below).
+    # Values from small vocabularies are interned so that facilities share one string object.
+    column_converters = {
+        'Municipality': sys.intern,
+        'Canton': sys.intern,
+        'BeginningOfOperation': str,
+        'TotalPower': parse_number,
+        'SubCategory': lambda value: translations.get(value, value),
+    }
+    csv_fields = [field for field in REQUIRED_FIELDS if field in column_converters]
 
     facilities = []
-    facilities_with_coords = 0
-    geocoded_facilities = 0
-
-    with open(csv_path, 'r', encoding='utf-8') as f:
+    # Facilities with LV95 coordinates, as (index in facilities, east, north)
+    lv95_coords = []
+    # Facilities to geocode, as address values -> indices in facilities
+    addresses = defaultdict(list)
+    stats = FacilityStats()
+    power_index = REQUIRED_FIELDS.index('TotalPower')
+    source_index = REQUIRED_FIELDS.index('SubCategory')
+
+    with open_zip_member(zip_ref, FACILITIES_CSV) as f:
         csvreader = csv.reader(f)
-        keys = None
 
-        for i, row in enumerate(csvreader):
-            # First row with 'xtf_id' contains the column headers
-            if 'xtf_id' in row[0]:
-                keys = row + ['lat', 'lon']
-                continue
-            if keys is None:
-                raise ValueError("No keys found in facilities data")
+        # First row contains the column headers, the last two of which are the LV95 coordinates
+        keys = next(csvreader, None)
+        if not keys or 'xtf_id' not in keys[0]:
+            raise ValueError("No keys found in facilities data")
+        missing_fields = set(csv_fields + ADDRESS_FIELDS) - set(keys)
+        if missing_fields:
+            raise ValueError(f"Missing fields in facilities data: {sorted(missing_fields)}")
 
+        # Resolve column positions once, so rows can be read as plain lists
+        field_columns = [(keys.index(field), column_converters[field]) for field in csv_fields]
+        address_columns = [keys.index(field) for field in ADDRESS_FIELDS]
+        east_column, north_column = len(keys) - 2, len(keys) - 1
+
+        for i, row in enumerate(csvreader, start=1):
             try:
-                values = []
-                for value in row:
-                    if value in translations:
-                        values.append(translations[value])
-                    elif value.replace('.', '').isdigit():
-                        values.append(float(value) if '.' in value else int(value))
-                    else:
-                        values.append(value)
-
-                if (len(values) >= 2 and
-                    # Check whether data contains coordinates (LV95) already
-                    isinstance(values[-2], (int, float)) and isinstance(values[-1], (int, float))):
-                    lat, lon = transformer.transform(values[-2], values[-1])
-                    values += [lat, lon]
-                    facilities_with_coords += 1
+                facility = [convert(row[column]) for column, convert in field_columns]
+
+                # Coordinates are filled in once all rows are read: LV95 coordinates are
+                # converted in one batch, and other facilities are geocoded by address.
+                east, north = parse_number(row[east_column]), parse_number(row[north_column])
+                if isinstance(east, (int, float)) and isinstance(north, (int, float)):
+                    lv95_coords.append((len(facilities), east, north))
+                    stats.with_coords += 1
                 else:
-                    # Try geocoding using address fields
-                    fields = dict(zip(keys[:-2], values)) # Last two keys are lat/lon
-
-                    address_parts = {}
-                    for field in ['Address', 'PostCode', 'Municipality']:
-                        if field in fields and fields[field]:
-                            address_parts[field] = fields[field]
-
-                    if (address_parts and address_parts['Address']
-                        and address_parts['PostCode'] and address_parts['Municipality']):
-                        lat, lon = geocoder.geocode(address_parts)
-                        if lat is not None and lon is not None:
-                            geocoded_facilities += 1
-                            facilities_with_coords += 1
-                    else:
-                        lat, lon = None, None
-
-                    values += [lat, lon]
-
-                all_fields = dict(zip(keys, values))
-                facility = [ all_fields[field] for field in REQUIRED_FIELDS ]
-                facilities.append(facility)
-            except ValueError as e:
+                    address = tuple(row[column] for column in address_columns)
+                    if all(address):
+                        addresses[address].append(len(facilities))
+
+                facilities.append(facility + [None, None])
+
+                if isinstance(facility[power_index], (int, float)):
+                    stats.total_power += facility[power_index]
+                stats.sources[facility[source_index] or 'Unknown'] += 1
+            except (IndexError, ValueError) as e:
                 logger.warning("Error processing facility row %d: %s", i, e)
                 continue
 
+    lat_index, lon_index = REQUIRED_FIELDS.index('lat'), REQUIRED_FIELDS.index('lon')
+    if lv95_coords:
+        indices, easts, norths = zip(*lv95_coords)
+        lons, lats = TRANSFORMER.transform(easts, norths)
+        for i, lat, lon in zip(indices, lats, lons):
+            facilities[i][lat_index] = lat
+            facilities[i][lon_index] = lon
+
+    # Geocode each distinct address once, even if it is shared by several facilities
+    logger.info("Geocoding %d distinct addresses...", len(addresses))
+    for address, indices in addresses.items():
+        lat, lon = geocoder.geocode(dict(zip(ADDRESS_FIELDS, address)))
+        if lat is None or lon is None:
+            continue
+        for i in indices:
+            facilities[i][lat_index] = lat
+            facilities[i][lon_index] = lon
+        stats.geocoded += len(indices)
+        stats.with_coords += len(indices)
+
     # Save the updated geocoding cache
     geocoder.save()
 
     logger.info("Processed %d facilities, %d with GPS coordinates (%d from data, %d geocoded)",
-                len(facilities), facilities_with_coords,
-                facilities_with_coords - geocoded_facilities, geocoded_facilities)
-    return facilities
+                len(facilities), stats.with_coords,
+                stats.with_coords - stats.geocoded, stats.geocoded)
+    stats.num_facilities = len(facilities)
+    return facilities, stats
 
-def import_production(csv_content : str) -> list[dict]:
+def import_production(csv_path : str) -> list[dict]:
     """Import production data from CSV file."""
     logger.info("Importing production data...")
 
-    # Group data by date
-    daily_data = defaultdict(lambda: [0.0] * 6)
+    # Group data by date: date -> production by source, in PRODUCTION_SOURCE_INDEX order
+    num_sources = len(PRODUCTION_SOURCE_INDEX)
+    daily_data = {}
     processed_rows = 0
-    csv_reader = csv.DictReader(csv_content.splitlines())
-    for row in csv_reader:
-        try:
-            date = row['Datum']  # Format: YYYY-MM-DD
-            energy_source = row['Energietraeger']
-            production_gwh = float(row['Produktion_GWh'])
-
-            if energy_source in PRODUCTION_SOURCE_INDEX:
-                source_index = PRODUCTION_SOURCE_INDEX[energy_source]
-                daily_data[date][source_index] = production_gwh
+    # Bound once to keep lookups out of the per-row loop
+    get_source_index = PRODUCTION_SOURCE_INDEX.get
+    get_day_val = daily_data.get
+    last_date, day_val = None, None
+    with open(csv_path, 'r', encoding='utf-8', newline='', buffering=READ_BUFFER_SIZE) as f:
+        csv_reader = csv.reader(f)
+
+        # Resolve column positions once
+        header = next(csv_reader, [])
+        missing_fields = {'Datum', 'Energietraeger', 'Produktion_GWh'} - set(header)
+        if missing_fields:
+            raise ValueError(f"Missing fields in production data: {sorted(missing_fields)}")
+        date_column = header.index('Datum')
+        source_column = header.index('Energietraeger')
+        value_column = header.index('Produktion_GWh')
+
+        for row in csv_reader:
+            try:
+                date = row[date_column]  # Format: YYYY-MM-DD
+                energy_source = row[source_column]
+                production_gwh = float(row[value_column])
+
+                source_index = get_source_index(energy_source)
+                if source_index is None:
+                    logger.warning("Unknown energy source: %s", energy_source)
+                    continue
+
+                # Rows come grouped by date, so the previous row's day usually still applies
+                if date != last_date:
+                    day_val = get_day_val(date)
+                    if day_val is None:
+                        day_val = daily_data[date] = [0.0] * num_sources
+                    last_date = date
+                day_val[source_index] = production_gwh
                 processed_rows += 1
-            else:
-                logger.warning("Unknown energy source: %s", energy_source)
 
-        except (KeyError, ValueError) as e:
-            logger.warning("Error processing production row: %s: %s", row, e)
-            continue
+            except (IndexError, ValueError) as e:
+                logger.warning("Error processing production row: %s: %s", row, e)
+                continue
 
     logger.info("Processed %s data points", processed_rows)
 
-    result = []
-    for date in sorted(daily_data.keys()):
-        result.append({
-            'date': date,
-            'val': daily_data[date]
-        })
+    result = [{'date': date, 'val': day_val} for date, day_val in sorted(daily_data.items())]
 
     logger.info("Generated data for %s days", len(result))
     return result
 
-def import_trade(csv_content: str) -> list[dict]:
+def import_trade(csv_path: str) -> list[dict]:
     """Import trade data from CSV file and aggregate hourly data to daily."""
     logger.info("Importing trade data...")
 
+    num_flows = len(TRADE_FLOW_INDEX)
     daily_aggregated = {}
     processed_rows = 0
-    csv_reader = csv.DictReader(csv_content.splitlines())
-
-    for row in csv_reader:
-        try:
-            date_str = row['Date']
-            date_key = datetime.fromisoformat(date_str).date().isoformat()
-
-            trade_flows = [0.0] * len(TRADE_FLOW_INDEX)
-            for field, index in TRADE_FLOW_INDEX.items():
-                if field in row:
-                    trade_flows[index] = float(row[field])
-
-            if date_key not in daily_aggregated:
-                daily_aggregated[date_key] = {
-                    'date': date_key,
-                    'val': [0.0] * len(TRADE_FLOW_INDEX),
-                }
+    with open(csv_path, 'r', encoding='utf-8', newline='', buffering=READ_BUFFER_SIZE) as f:
+        csv_reader = csv.reader(f)
+
+        # Resolve column positions once; flows missing from the file stay at zero
+        header = next(csv_reader, [])
+        if 'Date' not in header:
+            raise ValueError("No 'Date' column found in trade data")
+        date_column = header.index('Date')
+        flow_indices = [index for field, index in TRADE_FLOW_INDEX.items() if field in header]
+        flow_columns = [header.index(field) for field in TRADE_FLOW_INDEX if field in header]
+
+        for row in csv_reader:
+            try:
+                date_key = datetime.fromisoformat(row[date_column]).date().isoformat()
+                trade_flows = [float(row[column]) for column in flow_columns]
 
-            for i in range(len(TRADE_FLOW_INDEX)):
-                daily_aggregated[date_key]['val'][i] += trade_flows[i]
+                day_val = daily_aggregated.get(date_key)
+                if day_val is None:
+                    day_val = daily_aggregated[date_key] = [0.0] * num_flows
+                for index, flow in zip(flow_indices, trade_flows):
+                    day_val[index] += flow
 
-            processed_rows += 1
+                processed_rows += 1
 
-        except (KeyError, ValueError) as e:
-            logger.warning("Error processing trade row: %s: %s", row, e)
-            continue
+            except (IndexError, ValueError) as e:
+                logger.warning("Error processing trade row: %s: %s", row, e)
+                continue
 
-    result = []
-    for date_key in sorted(daily_aggregated.keys()):
-        day_data = daily_aggregated[date_key]
-        result.append({
-            'date': day_data['date'],
-            'val': day_data['val']  # Keep as daily totals (MWh per day)
-        })
+    # Keep as daily totals (MWh per day)
+    result = [{'date': date_key, 'val': day_val}
+              for date_key, day_val in sorted(daily_aggregated.items())]
 
     logger.info("Processed %d data points into %d daily records", processed_rows, len(result))
     return result
 
-def save_compressed_json(data : list[dict], output_file : str):
-    """Save data as compressed JSON using atomic write."""
-    json_str = json.dumps(data, separators=(',', ':'))
+def replace_non_finite(obj):
+    """Replace NaN and infinite floats in nested lists and dicts with None, as orjson does."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, list):
+        return [replace_non_finite(value) for value in obj]
+    if isinstance(obj, dict):
+        return {key: replace_non_finite(value) for key, value in obj.items()}
+    return obj
+
+def dumps_json(obj) -> bytes:
+    """
+    Encode obj as compact UTF-8 JSON, using orjson if it is installed. Both encoders write
+    NaN and infinite values as null, since JSON has no representation for them.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    try:
+        text = json.dumps(obj, separators=(',', ':'), ensure_ascii=False, allow_nan=False)
+    except ValueError:
+        text = json.dumps(replace_non_finite(obj), separators=(',', ':'), ensure_ascii=False)
+    return text.encode('utf-8')
+
+def open_compressed(path : str, compression : str, level : int):
+    """Open a file for binary writing through the given compressor."""
+    if compression == 'zstd':
+        import zstandard as zstd  # pylint: disable=import-outside-toplevel
+        cctx = zstd.ZstdCompressor(level=level, threads=-1)
+        return cctx.stream_writer(open(path, 'wb'))
+    # Buffer writes so that small ones (e.g. separators) don't each go through zlib
+    return io.BufferedWriter(gzip.GzipFile(path, 'wb', compresslevel=level),
+                             buffer_size=WRITE_BUFFER_SIZE)
+
+def save_compressed_json(data : list, output_file : str,
+                         compression : str = 'gzip', level : int = 6):
+    """Save data as compressed JSON (gzip or zstd, at the given level) using atomic write."""
     output_dir = os.path.dirname(output_file)
     temp_path = None
 
@@ -427,14 +699,23 @@ def save_compressed_json(data : list[dict], output_file : str):
         fd, temp_path = tempfile.mkstemp(
             dir=output_dir,
             prefix='.prod_temp_',
-            suffix='.json.gz'
+            suffix=OUTPUT_SUFFIXES[compression]
         )
         os.close(fd)
 
-        with gzip.open(temp_path, 'wt', encoding='utf-8') as gz_file:
-            gz_file.write(json_str)
+        # Encode and compress a chunk of records at a time, so the JSON text of the whole
+        # array is never held in memory.
+        with open_compressed(temp_path, compression, level) as out_file:
+            out_file.write(b'[')
+            for start in range(0, len(data), JSON_CHUNK_RECORDS):
+                if start:
+                    out_file.write(b',')
+                # Encode the whole slice as one array and strip its brackets
+                out_file.write(dumps_json(data[start:start + JSON_CHUNK_RECORDS])[1:-1])
+            out_file.write(b']')
         os.chmod(temp_path, 0o644)
-        shutil.move(temp_path, output_file)
+        # Temp file is in the output directory, so this is an atomic rename
+        os.replace(temp_path, output_file)
         temp_path = None  # Successfully moved, don't clean up
 
         file_size = os.path.getsize(output_file)
@@ -446,27 +727,33 @@ def save_compressed_json(data : list[dict], output_file : str):
             os.unlink(temp_path)
         raise e
 
-def print_summary(facilities_data : list[dict], production_data : list[dict],
+def import_dataset(import_fn : Callable[[], tuple[list, object]], output_file : str,
+                   compression : str, level : int) -> tuple[list, object]:
+    """
+    Run one dataset import, which returns (data, stats), and save its data, if any, as
+    compressed JSON. Returns the import result.
+    """
+    data, stats = import_fn()
+    if data:
+        save_compressed_json(data, output_file, compression, level)
+    return data, stats
+
+def print_summary(facilities_stats : FacilityStats | None, production_data : list[dict],
                   trade_data : list[dict] = None):
     """Print summary statistics."""
     print("\nData Import Summary:")
 
-    if facilities_data:
-        facilities_with_coords = len([f for f in facilities_data if f.get('lat') and f.get('lon')])
-        total_power = sum(f.get('TotalPower', 0) for f in facilities_data) / 1000  # Convert to MW
+    if facilities_stats and facilities_stats.num_facilities:
+        total_power = facilities_stats.total_power / 1000  # Convert to MW
 
         print("Facilities:")
-        print(f"  Total facilities: {len(facilities_data):,}")
-        print(f"  With GPS coordinates: {facilities_with_coords:,}")
+        print(f"  Total facilities: {facilities_stats.num_facilities:,}")
+        print(f"  With GPS coordinates: {facilities_stats.with_coords:,}")
         print(f"  Total capacity: {total_power:.1f} MW")
 
         # Total by energy source
-        sources = defaultdict(int)
-        for f in facilities_data:
-            sources[f.get('SubCategory', 'Unknown')] += 1
-
         print("  Number of facilities by energy source:")
-        for source, count in sorted(sources.items(), key=lambda x: x[0]):
+        for source, count in sorted(facilities_stats.sources.items()):
             print(f"    {source}: {count:,}")
 
     if production_data:
@@ -474,17 +761,15 @@ def print_summary(facilities_data : list[dict], production_data : list[dict],
         end_date = production_data[-1]['date']
 
         # Totals by energy source
-        totals = [0.0] * 6
-        for record in production_data:
-            for i, val in enumerate(record['val']):
-                totals[i] += val
+        daily_vals = (record['val'] for record in production_data)
+        totals = [sum(source_vals) for source_vals in zip(*daily_vals)]
 
         print("\nProduction Data:")
         print(f"  Date range: {start_date} to {end_date}")
         print(f"  Total days: {len(production_data):,}")
         print("  Total production by source (GWh):")
 
-        for i, (name, total) in enumerate(zip(PRODUCTION_SOURCE_NAMES, totals)):
+        for name, total in zip(PRODUCTION_SOURCE_NAMES, totals):
             print(f"    {name}: {total:.1f} GWh")
 
     if trade_data:
@@ -501,8 +786,10 @@ def main():
         description='Import Swiss energy facilities and production data')
     parser.add_argument('--dest_root', default='.',
         help='Root directory for output files')
-    parser.add_argument('--geocode-cache', default='geocode-cache.txt',
-        help='Geocode cache file')
+    parser.add_argument('--download-dir',
+        help='Directory for downloaded files (default: $DEST_ROOT/downloads)')
+    parser.add_argument('--geocode-cache', default='geocode-cache.sqlite',
+        help='Geocode cache file (SQLite; a legacy .txt cache is migrated next to it)')
     parser.add_argument('--summary', action='store_true',
         help='Show data summary after processing')
     parser.add_argument('--facilities-only', action='store_true',
@@ -511,49 +798,52 @@ def main():
         help='Only process production data')
     parser.add_argument('--trade-only', action='store_true',
         help='Only process trade data')
+    parser.add_argument('--force-download', action='store_true',
+        help='Download data even if unchanged or already downloaded today')
+    parser.add_argument('--gzip-level', type=int, default=6, choices=range(1, 10), metavar='{1-9}',
+        help='Gzip compression level for output files (default: 6)')
+    parser.add_argument('--compression', choices=list(OUTPUT_SUFFIXES), default='gzip',
+        help='Compression format for output files (default: gzip)')
+    parser.add_argument('--zstd-level', type=int, default=15,
+        choices=range(1, 23), metavar='{1-22}',
+        help='Zstd compression level for output files (default: 15)')
     args = parser.parse_args()
 
-    ensure_directories(args.dest_root)
+    suffix = OUTPUT_SUFFIXES[args.compression]
+    level = args.zstd_level if args.compression == 'zstd' else args.gzip_level
 
-    facilities_data = []
-    production_data = []
-    trade_data = []
+    download_dir = args.download_dir or os.path.join(args.dest_root, 'downloads')
+    ensure_directories(args.dest_root, download_dir)
 
-    # Import facilities data
+    # Datasets are independent and mostly wait on the network, so import them concurrently
+    jobs = {}
     if not args.production_only and not args.trade_only:
-        csv_path = download_facilities()
-        facilities_data = import_facilities(csv_path, Geocoder(args.geocode_cache))
-
-        if facilities_data:
-            save_compressed_json(
-                facilities_data,
-                os.path.join(args.dest_root, 'data', 'facilities.json.gz'),
-            )
-
-    # Import production data
+        jobs['facilities'] = lambda: import_facilities(
+            download_facilities(download_dir, args.force_download), Geocoder(args.geocode_cache))
     if not args.facilities_only and not args.trade_only:
-        csv_content = download_csv(PRODUCTION_URL, "production")
-        production_data = import_production(csv_content)
-
-        if production_data:
-            save_compressed_json(
-                production_data,
-                os.path.join(args.dest_root, 'data', 'production.json.gz'),
-            )
-
-    # Import trade data
+        jobs['production'] = lambda: (import_production(
+            download_csv(PRODUCTION_URL, "production", download_dir, args.force_download)), None)
     if not args.facilities_only and not args.production_only:
-        csv_content = download_csv(TRADE_URL, "trade")
-        trade_data = import_trade(csv_content)
+        jobs['trade'] = lambda: (import_trade(
+            download_csv(TRADE_URL, "trade", download_dir, args.force_download)), None)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as executor:
+        futures = {
+            executor.submit(import_dataset, job,
+                            os.path.join(args.dest_root, 'data', name + suffix),
+                            args.compression, level): name
+            for name, job in jobs.items()
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
 
-        if trade_data:
-            save_compressed_json(
-                trade_data,
-                os.path.join(args.dest_root, 'data', 'trade.json.gz'),
-            )
+    _, facilities_stats = results.get('facilities', ([], None))
+    production_data, _ = results.get('production', ([], None))
+    trade_data, _ = results.get('trade', ([], None))
 
     if args.summary:
-        print_summary(facilities_data, production_data, trade_data)
+        print_summary(facilities_stats, production_data, trade_data)
 
     # Write last update timestamp
     last_update_file = os.path.join(args.dest_root, 'data', 'last-update.txt')